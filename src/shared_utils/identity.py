@@ -1,67 +1,188 @@
+import asyncio
+import hashlib
 import uuid
+from functools import lru_cache
+
 import oracledb
 from loguru import logger as log
-import asyncio
 
 # Namespace for Trading App Accounts - DO NOT CHANGE
 TRADING_IDENTITY_NAMESPACE = uuid.UUID('951e7376-a07e-52ad-9477-030913972236')
+_NS_BYTES = TRADING_IDENTITY_NAMESPACE.bytes
+
+# Explicitly insert ALL required columns, including analytics_id
+_PROVISION_SQL = """
+MERGE INTO users u
+USING (SELECT :id_raw AS id FROM dual) src
+ON (u.id = src.id)
+WHEN NOT MATCHED THEN
+    INSERT (id, email, hashed_password, user_data, analytics_id)
+    VALUES (:id_raw, :email, :pw, '{"type": "jit_provisioned_system_account"}', :analytics_raw)
+"""
 
+@lru_cache(maxsize=256)
 def get_account_uuid(account_id: str) -> uuid.UUID:
     """
     Deterministically converts a string account ID (e.g., 'deribit-148510')
     into a valid UUIDv5 for database persistence.
+    Results are memoized: the set of account IDs is small and fixed at runtime.
     """
-    return uuid.uuid5(TRADING_IDENTITY_NAMESPACE, account_id)
+    # Inlined uuid.uuid5: SHA-1 over namespace + name, then set the
+    # version 5 and RFC 4122 variant bits
+    b = bytearray(hashlib.sha1(_NS_BYTES + account_id.encode()).digest()[:16])
+    b[6] = (b[6] & 0x0F) | 0x50
+    b[8] = (b[8] & 0x3F) | 0x80
+    return uuid.UUID(bytes=bytes(b))
 
-async def provision_identity(pool: oracledb.SessionPool, account_id: str):
+async def provision_identity(
+    pool: oracledb.AsyncConnectionPool, account_id: str
+):
     """
     Ensures that a user record exists in the OCI 'users' table for the given legacy account ID.
     If it does not exist, it is created automatically (JIT Provisioning).
     """
     user_uuid = get_account_uuid(account_id)
     
-    # Create a deterministic analytics ID so it remains constant across restarts
-    analytics_uuid = uuid.uuid5(TRADING_IDENTITY_NAMESPACE, f"{account_id}_analytics")
-    
-    dummy_email = f"{account_id}@legacy.system"
-    dummy_hash = "SYSTEM_ACCOUNT_LOCKED"
-    
-    # Explicitly insert ALL required columns, including analytics_id
-    sql = """
-    MERGE INTO users u
-    USING (SELECT :id_raw AS id FROM dual) src
-    ON (u.id = src.id)
-    WHEN NOT MATCHED THEN
-        INSERT (id, email, hashed_password, user_data, analytics_id)
-        VALUES (:id_raw, :email, :pw, '{"type": "jit_provisioned_system_account"}', :analytics_raw)
-    """
-    
     log.info(f"Provisioning identity for '{account_id}' (User UUID: {user_uuid})...")
     
     try:
-        # Run in a separate thread because oracledb is blocking
-        await asyncio.to_thread(
-            _execute_provision_sql, 
-            pool, 
-            sql, 
-            user_uuid, 
-            dummy_email, 
-            dummy_hash,
-            analytics_uuid
-        )
+        async with pool.acquire() as connection:
+            with connection.cursor() as cursor:
+                await cursor.execute(_PROVISION_SQL, _provision_row(account_id))
+            await connection.commit()
         log.success(f"Identity for '{account_id}' is provisioned and ready.")
     except Exception as e:
         log.critical(f"Failed to provision identity for '{account_id}': {e}")
         # We re-raise to stop the application start-up, as it cannot function without a DB user
         raise
 
-def _execute_provision_sql(pool, sql, user_uuid, email, pw, analytics_uuid):
-    with pool.acquire() as connection:
-        with connection.cursor() as cursor:
-            cursor.execute(sql, {
-                "id_raw": user_uuid.bytes,
-                "email": email,
-                "pw": pw,
-                "analytics_raw": analytics_uuid.bytes
-            })
-            connection.commit()
+async def provision_identities(
+    pool: oracledb.AsyncConnectionPool, account_ids: list[str]
+):
+    """
+    Batch variant of provision_identity: provisions every account in one
+    round-trip (executemany) on a single pooled connection.
+    """
+    if not account_ids:
+        return
+
+    rows = [_provision_row(account_id) for account_id in account_ids]
+
+    log.info(f"Provisioning {len(rows)} identities: {', '.join(account_ids)}...")
+
+    try:
+        async with pool.acquire() as connection:
+            with connection.cursor() as cursor:
+                await cursor.executemany(_PROVISION_SQL, rows)
+            await connection.commit()
+        log.success(f"{len(rows)} identities are provisioned and ready.")
+    except Exception as e:
+        log.critical(f"Failed to provision identities {account_ids}: {e}")
+        raise
+
+class ProvisioningWorker:
+    """
+    Provisions identities over a single long-lived pooled connection.
+    The connection is acquired once in start(); submit() queues an account ID
+    and returns once its MERGE has been committed (or re-raises the DB error).
+    A stopped worker cannot be restarted.
+    """
+
+    def __init__(self, pool: oracledb.AsyncConnectionPool):
+        self._pool = pool
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: asyncio.Task | None = None
+        # Flags are flipped before the first await so concurrent start()/stop()
+        # calls cannot interleave with each other or with submit()
+        self._started = False
+        self._stopping = False
+
+    async def start(self):
+        """Starts the worker; re-raises if the connection cannot be acquired."""
+        if self._started:
+            return
+        self._started = True
+        # The task owns the connection from acquire to release, so a stop()
+        # issued while start() is still acquiring waits for that release too
+        ready = asyncio.get_running_loop().create_future()
+        self._task = asyncio.create_task(self._run(ready))
+        await asyncio.shield(ready)
+
+    async def stop(self):
+        """Drains already-queued work, then releases the connection."""
+        if not self._started:
+            return
+        if not self._stopping:
+            self._stopping = True
+            self._queue.put_nowait(None)
+        # Shielded: cancelling stop() (e.g. a shutdown timeout) must not abort
+        # the in-flight MERGE or the work still queued behind it
+        await asyncio.shield(self._task)
+
+    async def submit(self, account_id: str):
+        if not self._started or self._stopping or self._task.done():
+            raise RuntimeError("ProvisioningWorker is not running")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((account_id, future))
+        await future
+
+    async def _run(self, ready: asyncio.Future):
+        try:
+            connection = await self._pool.acquire()
+        except Exception as e:
+            self._stopping = True
+            self._fail_pending()
+            ready.set_exception(e)
+            return
+        except BaseException:
+            self._stopping = True
+            self._fail_pending()
+            ready.cancel()
+            raise
+        ready.set_result(None)
+
+        future = None
+        try:
+            while (item := await self._queue.get()) is not None:
+                account_id, future = item
+                if future.done():
+                    # Submitter was cancelled while its item was queued
+                    continue
+                try:
+                    with connection.cursor() as cursor:
+                        await cursor.execute(_PROVISION_SQL, _provision_row(account_id))
+                    await connection.commit()
+                    log.success(
+                        f"Identity for '{account_id}' is provisioned and ready."
+                    )
+                    if not future.done():
+                        future.set_result(None)
+                except Exception as e:
+                    log.critical(
+                        f"Failed to provision identity for '{account_id}': {e}"
+                    )
+                    if not future.done():
+                        future.set_exception(e)
+                future = None
+        finally:
+            # Never leave a submitter waiting on a worker that has gone away
+            self._stopping = True
+            if future is not None and not future.done():
+                future.set_exception(RuntimeError("ProvisioningWorker stopped"))
+            self._fail_pending()
+            await self._pool.release(connection)
+
+    def _fail_pending(self):
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None and not item[1].done():
+                item[1].set_exception(RuntimeError("ProvisioningWorker stopped"))
+
+def _provision_row(account_id: str) -> dict:
+    return {
+        "id_raw": get_account_uuid(account_id).bytes,
+        "email": f"{account_id}@legacy.system",
+        "pw": "SYSTEM_ACCOUNT_LOCKED",
+        # Deterministic analytics ID so it remains constant across restarts
+        "analytics_raw": get_account_uuid(f"{account_id}_analytics").bytes,
+    }
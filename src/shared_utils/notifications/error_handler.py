@@ -4,10 +4,9 @@ import asyncio
 import logging
 import traceback
 from datetime import datetime
+from functools import lru_cache
 from typing import Any, Callable, Coroutine, Dict, Optional
 
-from src.shared.config.config import config
-
 logger = logging.getLogger("error_handler")
 
 
@@ -17,6 +16,7 @@ class ErrorHandler:
         self._setup_notifiers()
 
     def _setup_notifiers(self):
+        from src.shared.config.config import config
 
         telegram_config = config["error_handling"]["telegram"]
         if telegram_config.get("bot_token") and telegram_config.get("chat_id"):
@@ -67,6 +67,8 @@ class ErrorHandler:
         severity: str,
     ) -> Dict[str, Any]:
         """Create structured error data"""
+        from src.shared.config.config import config, settings
+
         return {
             "timestamp": datetime.utcnow().isoformat(),
             "severity": severity,
@@ -104,5 +106,15 @@ class ErrorHandler:
         return wrapper
 
 
-# Global instance
-error_handler = ErrorHandler()
+@lru_cache(maxsize=1)
+def get_error_handler() -> ErrorHandler:
+    """Return the process-wide ErrorHandler, building it on first use"""
+    return ErrorHandler()
+
+
+def __getattr__(name: str) -> Any:
+    # Global instance, resolved lazily (PEP 562); config is imported inside the
+    # methods that use it, so importing this module does not load config
+    if name == "error_handler":
+        return get_error_handler()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,45 @@
+import pytest
+
+from shared_utils.notifications import error_handler as module
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    module.get_error_handler.cache_clear()
+    yield
+    module.get_error_handler.cache_clear()
+
+
+def test_import_does_not_build_handler():
+    # The config module is not importable here, so building the handler
+    # at import time would have failed already
+    assert "error_handler" not in vars(module)
+
+
+def test_error_handler_resolves_through_factory(monkeypatch):
+    sentinel = object()
+    monkeypatch.setattr(module, "get_error_handler", lambda: sentinel)
+
+    assert module.error_handler is sentinel
+
+    from shared_utils.notifications.error_handler import error_handler
+
+    assert error_handler is sentinel
+
+
+def test_get_error_handler_builds_once(monkeypatch):
+    class StubHandler:
+        built = 0
+
+        def __init__(self):
+            StubHandler.built += 1
+
+    monkeypatch.setattr(module, "ErrorHandler", StubHandler)
+
+    assert module.get_error_handler() is module.get_error_handler()
+    assert StubHandler.built == 1
+
+
+def test_unknown_attribute_raises():
+    with pytest.raises(AttributeError, match="no_such_name"):
+        module.no_such_name  # noqa: B018
@@ -0,0 +1,335 @@
+import asyncio
+import uuid
+from unittest.mock import MagicMock
+
+import pytest
+
+from shared_utils import identity
+from shared_utils.identity import (
+    TRADING_IDENTITY_NAMESPACE,
+    ProvisioningWorker,
+    get_account_uuid,
+    provision_identities,
+    provision_identity,
+)
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self._connection = connection
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    async def execute(self, sql, params):
+        self._connection.calls.append(("execute", sql, params))
+        self._connection.entered.set()
+        if self._connection.gate is not None:
+            await self._connection.gate.wait()
+        if self._connection.fail:
+            raise self._connection.fail
+
+    async def executemany(self, sql, rows):
+        self._connection.calls.append(("executemany", sql, rows))
+        if self._connection.fail:
+            raise self._connection.fail
+
+
+class FakeConnection:
+    def __init__(self, fail=None):
+        self.fail = fail
+        self.gate = None
+        self.entered = asyncio.Event()
+        self.calls = []
+        self.commits = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    async def commit(self):
+        self.commits += 1
+
+
+class FakeAcquire:
+    """Mimics oracledb's acquire(): usable with both await and async with."""
+
+    def __init__(self, pool):
+        self._pool = pool
+
+    def __await__(self):
+        return self._acquire().__await__()
+
+    async def _acquire(self):
+        if self._pool.gate is not None:
+            await self._pool.gate.wait()
+        if self._pool.fail:
+            raise self._pool.fail
+        self._pool.acquired += 1
+        return self._pool.connection
+
+    async def __aenter__(self):
+        self._pool.acquired += 1
+        return self._pool.connection
+
+    async def __aexit__(self, *exc):
+        self._pool.released += 1
+        return False
+
+
+class FakePool:
+    def __init__(self, fail=None):
+        self.connection = FakeConnection(fail)
+        self.gate = None
+        self.fail = None
+        self.acquired = 0
+        self.released = 0
+
+    def acquire(self):
+        return FakeAcquire(self)
+
+    async def release(self, connection):
+        self.released += 1
+
+
+@pytest.fixture
+def log(monkeypatch):
+    mock = MagicMock()
+    monkeypatch.setattr(identity, "log", mock)
+    return mock
+
+
+@pytest.mark.parametrize(
+    "account_id",
+    ["deribit-148510", "", "déribit-ünïcode-账户", "deribit-148510_analytics"],
+)
+def test_get_account_uuid_matches_uuid5(account_id):
+    # Persisted primary keys: must stay bit-identical to uuid.uuid5
+    assert get_account_uuid(account_id) == uuid.uuid5(
+        TRADING_IDENTITY_NAMESPACE, account_id
+    )
+
+
+def test_provision_identity_executes_and_commits(log):
+    pool = FakePool()
+
+    asyncio.run(provision_identity(pool, "deribit-1"))
+
+    calls = pool.connection.calls
+    assert [c[0] for c in calls] == ["execute"]
+    row = calls[0][2]
+    assert row["id_raw"] == get_account_uuid("deribit-1").bytes
+    assert row["analytics_raw"] == get_account_uuid("deribit-1_analytics").bytes
+    assert pool.connection.commits == 1
+    assert pool.acquired == pool.released == 1
+
+
+def test_provision_identity_logs_and_reraises(log):
+    pool = FakePool(fail=RuntimeError("ORA-00001"))
+
+    with pytest.raises(RuntimeError, match="ORA-00001"):
+        asyncio.run(provision_identity(pool, "deribit-1"))
+
+    log.critical.assert_called_once()
+    assert pool.connection.commits == 0
+
+
+def test_provision_identities_single_executemany(log):
+    pool = FakePool()
+
+    asyncio.run(provision_identities(pool, ["deribit-1", "deribit-2"]))
+
+    calls = pool.connection.calls
+    assert [c[0] for c in calls] == ["executemany"]
+    rows = calls[0][2]
+    assert [r["id_raw"] for r in rows] == [
+        get_account_uuid("deribit-1").bytes,
+        get_account_uuid("deribit-2").bytes,
+    ]
+    assert rows[0]["analytics_raw"] == get_account_uuid("deribit-1_analytics").bytes
+    assert rows[1]["email"] == "deribit-2@legacy.system"
+    assert pool.connection.commits == 1
+
+
+def test_provision_identities_empty_list_skips_db(log):
+    pool = FakePool()
+
+    asyncio.run(provision_identities(pool, []))
+
+    assert pool.acquired == 0
+    assert pool.connection.calls == []
+
+
+def test_provision_identities_logs_and_reraises(log):
+    pool = FakePool(fail=RuntimeError("ORA-00001"))
+
+    with pytest.raises(RuntimeError, match="ORA-00001"):
+        asyncio.run(provision_identities(pool, ["deribit-1"]))
+
+    log.critical.assert_called_once()
+    assert pool.connection.commits == 0
+
+
+def test_worker_submit_commits_on_one_connection(log):
+    async def main():
+        pool = FakePool()
+        worker = ProvisioningWorker(pool)
+        await asyncio.gather(worker.start(), worker.start())
+        await asyncio.gather(worker.submit("deribit-1"), worker.submit("deribit-2"))
+        await worker.stop()
+        return pool
+
+    pool = asyncio.run(main())
+
+    assert pool.acquired == 1
+    assert pool.released == 1
+    assert pool.connection.commits == 2
+    assert [c[2]["id_raw"] for c in pool.connection.calls] == [
+        get_account_uuid("deribit-1").bytes,
+        get_account_uuid("deribit-2").bytes,
+    ]
+
+
+def test_worker_propagates_db_error_and_keeps_running(log):
+    async def main():
+        pool = FakePool(fail=RuntimeError("ORA-00001"))
+        worker = ProvisioningWorker(pool)
+        await worker.start()
+        with pytest.raises(RuntimeError, match="ORA-00001"):
+            await worker.submit("deribit-1")
+        pool.connection.fail = None
+        await worker.submit("deribit-2")
+        await worker.stop()
+        return pool
+
+    pool = asyncio.run(main())
+
+    log.critical.assert_called_once()
+    assert pool.connection.commits == 1
+
+
+def test_worker_survives_cancelled_submitter(log):
+    async def main():
+        pool = FakePool()
+        pool.connection.gate = asyncio.Event()
+        worker = ProvisioningWorker(pool)
+        await worker.start()
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(worker.submit("deribit-1"), 0.01)
+        pool.connection.gate.set()
+        await asyncio.wait_for(worker.submit("deribit-2"), 1)
+        await worker.stop()
+        return pool
+
+    pool = asyncio.run(main())
+
+    log.critical.assert_not_called()
+    assert pool.connection.commits == 2
+
+
+def test_worker_stop_drains_queue_then_rejects_submit(log):
+    async def main():
+        pool = FakePool()
+        worker = ProvisioningWorker(pool)
+        await worker.start()
+        pending = asyncio.gather(worker.submit("deribit-1"), worker.submit("deribit-2"))
+        await asyncio.sleep(0)
+        await worker.stop()
+        await pending
+        with pytest.raises(RuntimeError, match="not running"):
+            await worker.submit("deribit-3")
+        return pool
+
+    pool = asyncio.run(main())
+
+    assert pool.connection.commits == 2
+    assert pool.released == 1
+
+
+def test_worker_fails_pending_work_when_task_dies(log):
+    async def main():
+        pool = FakePool()
+        pool.connection.gate = asyncio.Event()
+        worker = ProvisioningWorker(pool)
+        await worker.start()
+        in_flight = asyncio.create_task(worker.submit("deribit-1"))
+        queued = asyncio.create_task(worker.submit("deribit-2"))
+        await pool.connection.entered.wait()
+        worker._task.cancel()
+        results = await asyncio.wait_for(
+            asyncio.gather(in_flight, queued, return_exceptions=True), 1
+        )
+        with pytest.raises(RuntimeError, match="not running"):
+            await worker.submit("deribit-3")
+        return pool, results
+
+    pool, results = asyncio.run(main())
+
+    assert all(isinstance(r, RuntimeError) and "stopped" in str(r) for r in results)
+    assert pool.connection.commits == 0
+    assert pool.released == 1
+
+
+def test_worker_stop_during_start_releases_before_returning(log):
+    async def main():
+        pool = FakePool()
+        pool.gate = asyncio.Event()
+        worker = ProvisioningWorker(pool)
+        starting = asyncio.create_task(worker.start())
+        await asyncio.sleep(0)
+        stopping = asyncio.create_task(worker.stop())
+        await asyncio.sleep(0)
+        pool.gate.set()
+        await stopping
+        released_on_stop = pool.released
+        await starting
+        return pool, released_on_stop
+
+    pool, released_on_stop = asyncio.run(main())
+
+    assert pool.acquired == 1
+    assert released_on_stop == 1
+
+
+def test_worker_start_raises_when_acquire_fails(log):
+    async def main():
+        pool = FakePool()
+        pool.fail = RuntimeError("DPY-4011")
+        worker = ProvisioningWorker(pool)
+        with pytest.raises(RuntimeError, match="DPY-4011"):
+            await worker.start()
+        with pytest.raises(RuntimeError, match="not running"):
+            await worker.submit("deribit-1")
+        await worker.stop()
+        return pool
+
+    pool = asyncio.run(main())
+
+    assert pool.released == 0
+
+
+def test_worker_cancelled_stop_still_drains(log):
+    async def main():
+        pool = FakePool()
+        pool.connection.gate = asyncio.Event()
+        worker = ProvisioningWorker(pool)
+        await worker.start()
+        in_flight = asyncio.create_task(worker.submit("deribit-1"))
+        queued = asyncio.create_task(worker.submit("deribit-2"))
+        await pool.connection.entered.wait()
+        stopping = asyncio.create_task(worker.stop())
+        await asyncio.sleep(0)
+        stopping.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await stopping
+        pool.connection.gate.set()
+        await asyncio.gather(in_flight, queued)
+        await worker.stop()
+        return pool
+
+    pool = asyncio.run(main())
+
+    assert pool.connection.commits == 2
+    assert pool.released == 1